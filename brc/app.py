@@ -1,26 +1,36 @@
 import asyncio
 from base64 import urlsafe_b64decode, urlsafe_b64encode
 import datetime
+import enum
+import hashlib
+import hmac
 import json
 import os
 import uuid
-import aiohttp
 import discord
 import secrets as _secrets
 from discord.ext import commands
-from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
-from fastapi import Depends, FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.routing import Mount
 from fastapi.encoders import jsonable_encoder
 import orjson
 from piccolo.engine import engine_finder
+from piccolo.columns.combination import WhereRaw
 from piccolo_admin.endpoints import create_admin
-from fastapi.middleware.cors import CORSMiddleware
 import time
 import piccolo
 import pydantic
 from .silverpelt import Silverpelt, SilverpeltRequest
+from .registry import ListRegistry
+from .compression import CompressionMiddleware, PrecompressedCache
+from .cors import CORSMiddleware
+from .singleflight import SingleFlight
+from .roster import Roster
+from .users import UserCache
+from .notifications import QueueNotifier
+from .responses import JSSafeResponse, snowflakes_as_str, stringify_snowflakes, is_not_modified, not_modified, validator_headers
 
 from . import tables
 import inspect
@@ -36,6 +46,7 @@ for obj in tables_dict.values():
         _tables.append(obj)
 
 app = FastAPI(
+    default_response_class=JSSafeResponse,
     routes=[
         Mount(
             "/admin/",
@@ -50,18 +61,6 @@ app = FastAPI(
     ],
 )
 
-@app.middleware("http")
-async def cors(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["Access-Control-Allow-Origin"] = request.headers.get("Origin") or "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Accept"
-
-    if request.method == "OPTIONS":
-        response.status_code = 200
-    return response
-
 with open("site.html") as site:
     site_html = site.read()
 
@@ -92,7 +91,24 @@ with open("secrets.json") as f:
     secrets["reviewer"] = int(secrets["reviewer"])
     secrets["queue_channel"] = int(secrets["queue_channel"])
 
-silverpelt = Silverpelt(secrets)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# Added last so preflights are answered before anything else runs
+app.add_middleware(CORSMiddleware, allow_origins=secrets.get("cors_origins"))
+
+roster = Roster(
+    gid=secrets["gid"], 
+    reviewer=secrets["reviewer"], 
+    list_owner=int(secrets["list_owner"]), 
+    sudo=int(secrets["sudo"])
+)
+registry = ListRegistry(refresh=float(secrets.get("registry_refresh", 300)))
+silverpelt = Silverpelt(secrets, registry)
+users = UserCache(
+    bot,
+    ttl=float(secrets.get("user_cache_ttl", 3600)),
+    negative_ttl=float(secrets.get("user_cache_negative_ttl", 300)),
+    max_entries=int(secrets.get("user_cache_size", 10000))
+)
 
 @app.on_event("startup")
 async def open_database_connection_pool():
@@ -100,11 +116,17 @@ async def open_database_connection_pool():
     asyncio.create_task(bot.start(secrets["token"]))
     await bot.load_extension("jishaku")
     await engine.start_connnection_pool()
+    await registry.start()
+    await silverpelt.start()
+    notifier.start()
 
 
 @app.on_event("shutdown")
 async def close_database_connection_pool():
     engine = engine_finder()
+    await notifier.close()
+    await silverpelt.close()
+    await registry.close()
     await engine.close_connnection_pool()
 
 class List(pydantic.BaseModel):
@@ -114,14 +136,37 @@ class List(pydantic.BaseModel):
     domain: str | None = None
     state: tables.ListState
     icon: str | None = None
+    updated_at: datetime.datetime | None = None
+
+def _public_list(obj: dict) -> dict:
+    return {k: obj[k] for k in List.__fields__}
+
+# Serialized (and compressed) lists, rebuilt only when the registry changes
+list_cache = PrecompressedCache(minimum_size=1024)
 
 @app.get("/list/{id}", response_model=List)
-async def get_list(id: uuid.UUID):
-    return await tables.BotList.select(tables.BotList.id, tables.BotList.name, tables.BotList.description, tables.BotList.domain, tables.BotList.state, tables.BotList.icon).where(tables.BotList.id == id).first()
+async def get_list(request: Request, id: uuid.UUID):
+    obj = registry.get(id)
+    if not obj:
+        return ORJSONResponse({"error": "List not found"}, status_code=404)
+    return list_cache.response(
+        f"list:{id}", 
+        registry.version, 
+        request.headers, 
+        lambda: orjson.dumps(List(**_public_list(obj)).dict()),
+        last_modified=obj["updated_at"],
+    )
 
 @app.get("/lists", response_model=list[List])
-async def get_all_lists():
-    return await tables.BotList.select(tables.BotList.id, tables.BotList.name, tables.BotList.description, tables.BotList.domain, tables.BotList.state, tables.BotList.icon).order_by(tables.BotList.id, ascending=True)
+async def get_all_lists(request: Request):
+    lists = registry.all()
+    # No Last-Modified as deleting a list does not move the newest updated_at, only the (content hashed) ETag is reliable
+    return list_cache.response(
+        "lists", 
+        registry.version, 
+        request.headers, 
+        lambda: orjson.dumps([List(**_public_list(obj)).dict() for obj in lists]),
+    )
 
 class BotPost(pydantic.BaseModel):
     bot_id: str
@@ -148,6 +193,7 @@ class Bot(BotPost):
     reviewer: str | None = None
     invite_link: str | None = None
     username: str | None = "Unknown"
+    updated_at: datetime.datetime | None = None
 
 class ListUpdate(pydantic.BaseModel):
     name: str | None = None
@@ -203,58 +249,289 @@ async def update_list(list_id: uuid.UUID, update: ListUpdate, auth: str = Depend
     elif update.reset_secret_key:
         key = _secrets.token_urlsafe()
         await tables.BotList.update(secret_key=key).where(tables.BotList.id == list_id)
+        await registry.reload(list_id)
         return {"secret_key": key}
+    
+    if has_updated:
+        await registry.reload(list_id)
     return {"has_updated": has_updated}
 
+def _bot_fields(fields: str | None) -> tuple[str, ...] | None:
+    """Parses a ``fields`` parameter, ``bot_id`` is always included"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    if names - Bot.__fields__.keys():
+        raise ValueError(f"Unknown fields: {', '.join(sorted(names - Bot.__fields__.keys()))}")
+    return tuple(name for name in Bot.__fields__ if name in names or name == "bot_id")
+
+def _bot_row(row: dict, projection: tuple[str, ...] | None = None, js_safe: bool = True) -> dict:
+    """
+    Converts a ``bot_queue`` row to the shape of ``Bot`` (or only the fields in ``projection``)
+
+    Rows come straight from our own database so they are not validated again through pydantic, the response 
+    models are still used for the OpenAPI schema
+    """
+    if projection:
+        row = {name: row[name] for name in projection}
+    if js_safe:
+        stringify_snowflakes(row)
+    return row
+
+def _json(content, js_safe: bool = True, status_code: int = 200) -> ORJSONResponse:
+    """Returns ``content`` with snowflakes as strings (``js_safe``) or as integers"""
+    return (JSSafeResponse if js_safe else ORJSONResponse)(content, status_code=status_code)
+
+class SearchResult(pydantic.BaseModel):
+    bot_id: str
+    username: str | None = "Unknown"
+    description: str
+    tags: list[str] | None = None
+    state: tables.State
+    list_source: uuid.UUID
+    rank: float
+
+# Must be registered before /bots/{id}
+@app.get("/bots/search", response_model=list[SearchResult])
+async def search_bots(
+    q: str, 
+    state: tables.State | None = None, 
+    limit: int = 25, 
+    offset: int = 0, 
+    js_safe: bool = Depends(snowflakes_as_str)
+) -> list[SearchResult]:
+    """
+Searches the queue by name, description, long description and tags, best matches first
+
+``q`` supports web search syntax (such as ``"music bot" -nsfw``). Paginated using ``limit`` (up to 100) and ``offset``
+    """
+    if limit < 1 or limit > 100 or offset < 0:
+        return ORJSONResponse({"error": "Limit must be between 1 and 100 and offset must be positive"}, status_code=400)
+
+    return _json(await tables.BotQueue.raw(
+        f"""
+        SELECT bot_id{'::text' if js_safe else ''}, username, description, tags, state, list_source, ts_rank(search, query) AS rank
+        FROM bot_queue, websearch_to_tsquery('english', {{}}) AS query
+        WHERE search @@ query AND ({{}}::integer IS NULL OR state = {{}})
+        ORDER BY rank DESC, bot_id LIMIT {{}} OFFSET {{}}
+        """,
+        q, state, state, limit, offset
+    ), js_safe)
+
 @app.get("/bots/{id}", response_model=Bot)
-async def get_bot(id: int) -> Bot:
-    return await tables.BotQueue.select().where(tables.BotQueue.bot_id == id).first()
+async def get_bot(request: Request, id: int, fields: str | None = None, js_safe: bool = Depends(snowflakes_as_str)) -> Bot:
+    """
+Returns a bot in the queue
+
+``fields`` is an optional comma separated list of fields to return (such as ``bot_id,username,state,tags``), 
+only these fields are fetched and returned
+
+Supports conditional requests using the returned ``ETag`` (``If-None-Match``) or ``Last-Modified`` (``If-Modified-Since``)
+    """
+    try:
+        projection = _bot_fields(fields)
+    except ValueError as exc:
+        return ORJSONResponse({"error": str(exc)}, status_code=400)
+
+    # The body also depends on the requested fields and snowflake format
+    variant = hashlib.blake2b(repr((projection, js_safe)).encode(), digest_size=4).hexdigest()
+
+    def etag(updated_at: datetime.datetime) -> str:
+        return f'W/"{id}-{int(updated_at.timestamp() * 1_000_000)}-{variant}"'
+
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        curr = await tables.BotQueue.select(tables.BotQueue.updated_at).where(tables.BotQueue.bot_id == id).first()
+        if curr and is_not_modified(request.headers, etag(curr["updated_at"]), curr["updated_at"]):
+            return not_modified(etag(curr["updated_at"]), curr["updated_at"])
+
+    if projection:
+        row = await tables.BotQueue.select(*projection, *(("updated_at",) if "updated_at" not in projection else ())).where(tables.BotQueue.bot_id == id).first()
+    else:
+        row = await tables.BotQueue.select().where(tables.BotQueue.bot_id == id).first()
+    if not row:
+        return ORJSONResponse({"error": "Bot not found"}, status_code=404)
+
+    updated_at = row["updated_at"]
+    resp = _json(_bot_row(row, projection, js_safe), js_safe)
+    resp.headers.update(validator_headers(etag(updated_at), updated_at))
+    return resp
+
+def _encode_cursor(*values) -> str:
+    return urlsafe_b64encode(orjson.dumps(values)).decode()
+
+def _decode_cursor(cursor: str) -> list:
+    return orjson.loads(urlsafe_b64decode(cursor))
+
+class BotOrder(enum.Enum):
+    bot_id = "bot_id"
+    added_at = "added_at"
+
+bot_reads = SingleFlight(ttl=float(secrets.get("bots_micro_cache", 0)))
+
+class BotPage(pydantic.BaseModel):
+    bots: list[Bot]
+    next: str | None = None
+
+async def _lookup_bots(ids: list[str], fields: str | None, js_safe: bool) -> ORJSONResponse:
+    """Looks up many bots in one query, returns a map of bot id to bot (or null if the bot does not exist)"""
+    try:
+        projection = _bot_fields(fields)
+    except ValueError as exc:
+        return ORJSONResponse({"error": str(exc)}, status_code=400)
+
+    try:
+        bot_ids = list({int(id) for id in ids})
+    except ValueError:
+        return ORJSONResponse({"error": "Invalid bot ids"}, status_code=400)
+    if any(not -2 ** 63 <= id < 2 ** 63 for id in bot_ids):
+        # Would fail to bind as a bigint
+        return ORJSONResponse({"error": "Invalid bot ids"}, status_code=400)
+
+    bots = await tables.BotQueue.select(*(projection or ())).where(WhereRaw("bot_id = ANY({}::bigint[])", bot_ids))
 
-@app.get("/bots", response_model=list[Bot])
-async def get_all_bots() -> list[Bot]:
-    return await tables.BotQueue.select().order_by(tables.BotQueue.bot_id, ascending=True)
+    found = {str(bot["bot_id"]): _bot_row(bot, projection, js_safe) for bot in bots}
+
+    return _json({str(id): found.get(str(id)) for id in bot_ids}, js_safe)
+
+class BotLookup(pydantic.BaseModel):
+    ids: list[str]
+
+@app.post("/bots/lookup")
+async def lookup_bots(lookup: BotLookup, fields: str | None = None, js_safe: bool = Depends(snowflakes_as_str)):
+    """
+Looks up many bots (up to 1000) at once, returns a map of bot id to bot, bots that do not exist are ``null``
+
+``fields`` works the same as in ``GET /bots``
+    """
+    if len(lookup.ids) > 1000:
+        return ORJSONResponse({"error": "Cannot look up more than 1000 bots at once"}, status_code=400)
+    return await _lookup_bots(lookup.ids, fields, js_safe)
+
+@app.get("/bots", response_model=list[Bot] | BotPage)
+async def get_all_bots(
+    ids: str | None = None,
+    limit: int | None = None, 
+    cursor: str | None = None, 
+    order: BotOrder = BotOrder.bot_id,
+    state: tables.State | None = None,
+    list_source: uuid.UUID | None = None,
+    owner: int | None = None,
+    tags: list[str] | None = Query(None),
+    fields: str | None = None,
+    js_safe: bool = Depends(snowflakes_as_str),
+) -> list[Bot] | BotPage:
+    """
+Returns the bots in the queue
+
+Without ``limit`` or ``cursor``, every matching bot is returned as a list. 
+
+If either is set, a page (``{"bots": [...], "next": ...}``) of at most ``limit`` bots (100 by default, up to 500) is returned instead. 
+To get the next page, pass the ``next`` of the previous page as ``cursor``, ``next`` is null on the last page. Pages are ordered by 
+``order`` (``bot_id`` or ``added_at``) and the same ``order`` and filters must be used for every page.
+
+Filters:
+
+- ``state``: only bots in this state
+- ``list_source``: only bots added by this list
+- ``owner``: only bots owned (or co-owned) by this user
+- ``tags``: only bots with all of these tags, can be repeated
+
+``fields`` is an optional comma separated list of fields to return for each bot (such as ``bot_id,username,state,tags``), 
+only these fields are fetched and returned
+
+If ``ids`` (a comma separated list of up to 100 bot ids) is set, a map of bot id to bot is returned instead of a page, bots 
+that do not exist are ``null``. Use ``POST /bots/lookup`` for more bots
+
+Snowflakes (``bot_id``, ``owner``, ``extra_owners`` and ``reviewer``) are strings so JS clients do not lose precision, 
+clients that can handle 64 bit integers can pass ``snowflakes=int`` (or a ``X-Snowflakes: int`` header) to get them as numbers. 
+This works on every bot and action endpoint
+    """
+    if ids is not None:
+        ids = [id.strip() for id in ids.split(",") if id.strip()]
+        if len(ids) > 100:
+            return ORJSONResponse({"error": "Cannot look up more than 100 bots at once, use POST /bots/lookup"}, status_code=400)
+        return await _lookup_bots(ids, fields, js_safe)
+
+    # Pages are opt in so clients expecting every bot as a list keep working
+    paginate = limit is not None or cursor is not None
+    if limit is None:
+        limit = 100
+    if limit < 1 or limit > 500:
+        return ORJSONResponse({"error": "Limit must be between 1 and 500"}, status_code=400)
+
+    try:
+        projection = _bot_fields(fields)
+    except ValueError as exc:
+        return ORJSONResponse({"error": str(exc)}, status_code=400)
+
+    if projection:
+        # The cursor needs the order key even if it was not asked for
+        q = tables.BotQueue.select(*projection, *(("added_at",) if order == BotOrder.added_at and "added_at" not in projection else ()))
+    else:
+        q = tables.BotQueue.select()
+
+    if state is not None:
+        q = q.where(tables.BotQueue.state == state)
+    if list_source:
+        q = q.where(tables.BotQueue.list_source == list_source)
+    if owner:
+        q = q.where(WhereRaw("(owner = {} OR extra_owners @> ARRAY[{}]::bigint[])", owner, owner))
+    if tags:
+        q = q.where(WhereRaw("tags @> {}::text[]", [tag.lower() for tag in tags]))
+
+    if cursor:
+        try:
+            after = _decode_cursor(cursor)
+            if order == BotOrder.added_at:
+                added_at, bot_id = datetime.datetime.fromisoformat(after[0]), int(after[1])
+            else:
+                bot_id = int(after[0])
+        except Exception:
+            return ORJSONResponse({"error": "Invalid cursor"}, status_code=400)
+
+        if order == BotOrder.added_at:
+            q = q.where(
+                (tables.BotQueue.added_at > added_at) 
+                | ((tables.BotQueue.added_at == added_at) & (tables.BotQueue.bot_id > bot_id))
+            )
+        else:
+            q = q.where(tables.BotQueue.bot_id > bot_id)
+
+    if order == BotOrder.added_at:
+        q = q.order_by(tables.BotQueue.added_at, tables.BotQueue.bot_id, ascending=True)
+    else:
+        q = q.order_by(tables.BotQueue.bot_id, ascending=True)
+
+    async def fetch() -> list[dict] | dict:
+        if not paginate:
+            return [_bot_row(bot, projection, js_safe) for bot in await q]
+
+        # Fetch one extra row to know if there is a next page
+        bots = await q.limit(limit + 1)
+
+        next = None
+        if len(bots) > limit:
+            bots = bots[:limit]
+            last = bots[-1]
+            if order == BotOrder.added_at:
+                next = _encode_cursor(last["added_at"], last["bot_id"])
+            else:
+                next = _encode_cursor(last["bot_id"])
+
+        return {"bots": [_bot_row(bot, projection, js_safe) for bot in bots], "next": next}
+
+    # Identical concurrent requests (such as many panels loading at once) share one query
+    key = (paginate, limit, cursor, order, state, list_source, owner, tuple(tags or ()), projection, js_safe)
+    return _json(await bot_reads.do(key, fetch), js_safe)
 
 @app.get("/team")
 async def our_team():
-    guild = bot.get_guild(int(secrets["gid"]))
-    if not guild:
+    if not roster.ready:
         return {"detail": "Guild not found"}
-    
-    team = []
-
-    for member in guild.members:
-        if member.id in []:
-            continue
-
-        list_roles = []
-        is_list_owner = False
-        sudo = False
-        is_reviewer = False
-        for role in member.roles:
-            if "list" in role.name.lower() and not role.name.lower().startswith("list"):
-                list_roles.append(role.name)
-
-            if role.id == int(secrets["list_owner"]):
-                is_list_owner = True
-            elif role.id == int(secrets["sudo"]):
-                sudo = True
-            elif role.id == int(secrets["reviewer"]):
-                is_reviewer = True
-
-        if is_reviewer:
-            team.append({
-                "username": member.name, 
-                "id": str(member.id), 
-                "avatar": member.avatar.url,
-                "is_list_owner": is_list_owner,
-                "sudo": sudo,
-                "roles": list_roles
-            })
-
-    return team
+    return Response(roster.snapshot(), media_type="application/json")
 
 class Action(pydantic.BaseModel):
-    id: int
+    id: uuid.UUID
     bot_id: str
     action: tables.Action
     reason: str
@@ -263,27 +540,203 @@ class Action(pydantic.BaseModel):
     list_source: uuid.UUID
 
 @app.get("/actions", response_model=list[Action])
-async def get_actions(offset: int = 0, limit: int = 50) -> list[Action]:
+async def get_actions(
+    limit: int = 50, 
+    cursor: str | None = None,
+    offset: int | None = None,
+    bot_id: int | None = None,
+    list_source: uuid.UUID | None = None,
+    reviewer: str | None = None,
+    action: tables.Action | None = None,
+    js_safe: bool = Depends(snowflakes_as_str),
+) -> list[Action]:
     """
-Returns a list of review action (such as claim bot, unclaim bot, approve bot and deny bot etc.)
+Returns a list of review action (such as claim bot, unclaim bot, approve bot and deny bot etc.), newest first
 
 ``list_source`` will not be present in all cases.
 
 **This is purely to allow Metro Review lists to debug their code**
 
-Paginated using ``limit`` (how many rows to return at maximum) and ``offset`` (how many rows to skip). Maximum limit is 200
+Paginated using ``limit`` (how many rows to return at maximum, up to 200) and ``cursor``. To get the next page, 
+pass the ``X-Next-Cursor`` header of the previous page as ``cursor``, the header is not sent on the last page.
+
+Can be filtered by ``bot_id``, ``list_source``, ``reviewer`` and ``action``, the same filters must be used for every page
+
+``offset`` (how many rows to skip) still works but is deprecated as it gets slower the further in you page, use ``cursor`` instead
     """
-    if limit > 200:
-        return []
-    return await tables.BotAction.select().limit(limit).offset(offset).order_by(tables.BotAction.action_time, ascending=False)
+    if offset is not None and (offset < 0 or cursor):
+        return ORJSONResponse({"error": "Offset must be positive and cannot be used with cursor"}, status_code=400)
+
+    if limit < 1 or limit > 200:
+        return ORJSONResponse({"error": "Limit must be between 1 and 200"}, status_code=400)
+
+    q = tables.BotAction.select()
+
+    if bot_id:
+        q = q.where(tables.BotAction.bot_id == bot_id)
+    if list_source:
+        q = q.where(tables.BotAction.list_source == list_source)
+    if reviewer:
+        q = q.where(tables.BotAction.reviewer == reviewer)
+    if action is not None:
+        q = q.where(tables.BotAction.action == action)
+
+    if cursor:
+        try:
+            after = _decode_cursor(cursor)
+            action_time, id = datetime.datetime.fromisoformat(after[0]), uuid.UUID(after[1])
+        except Exception:
+            return ORJSONResponse({"error": "Invalid cursor"}, status_code=400)
+
+        q = q.where(
+            (tables.BotAction.action_time < action_time)
+            | ((tables.BotAction.action_time == action_time) & (tables.BotAction.id < id))
+        )
+
+    q = q.order_by(tables.BotAction.action_time, tables.BotAction.id, ascending=False)
+
+    if offset:
+        q = q.offset(offset)
+
+    # Fetch one extra row to know if there is a next page
+    actions = await q.limit(limit + 1)
+
+    next = None
+    if len(actions) > limit:
+        actions = actions[:limit]
+        next = _encode_cursor(actions[-1]["action_time"], str(actions[-1]["id"]))
+
+    if js_safe:
+        for action in actions:
+            stringify_snowflakes(action)
+
+    resp = _json(actions, js_safe)
+    if next:
+        resp.headers["X-Next-Cursor"] = next
+    return resp
     
+def _histogram_percentiles(buckets: dict[int, int]) -> dict[str, int | None]:
+    """Estimates percentiles (in seconds) from a latency histogram, None means over 30 days"""
+    total = sum(buckets.values())
+    ordered = sorted(buckets.items(), key=lambda b: b[0] if b[0] >= 0 else float("inf"))
+
+    def percentile(p: float) -> int | None:
+        seen = 0
+        for bound, count in ordered:
+            seen += count
+            if seen >= p * total:
+                return bound if bound >= 0 else None
+        return None
+
+    if not total:
+        return {"samples": 0, "p50": None, "p90": None, "p99": None}
+    return {"samples": total, "p50": percentile(0.5), "p90": percentile(0.9), "p99": percentile(0.99)}
+
+@app.get("/stats")
+async def get_stats():
+    """
+Returns statistics about the queue
+
+- ``states``: number of bots in each state
+- ``lists``: number of bots in each state per list they were added from
+- ``tags``: number of bots in each state per tag
+- ``reviewers``: number of times each reviewer moved a bot to each state
+- ``claim_time`` and ``decision_time``: approximate percentiles (in seconds) of the time from a bot being added to being claimed and approved/denied 
+
+These are maintained as bots change, so this is cheap to poll
+    """
+    counters = await tables.QueueCounter.select(
+        tables.QueueCounter.kind, 
+        tables.QueueCounter.name, 
+        tables.QueueCounter.state, 
+        tables.QueueCounter.count
+    ).where(tables.QueueCounter.count != 0)
+
+    stats = {"states": {}, "lists": {}, "tags": {}, "reviewers": {}}
+    histograms: dict[str, dict[int, int]] = {"claim_time": {}, "decision_time": {}}
+
+    for counter in counters:
+        if counter["kind"] in histograms:
+            histograms[counter["kind"]][int(counter["name"])] = counter["count"]
+            continue
+        state = tables.State(counter["state"]).name
+        if counter["kind"] == "state":
+            stats["states"][state] = counter["count"]
+        elif counter["kind"] in ("list", "tag", "reviewer"):
+            stats[counter["kind"] + "s"].setdefault(counter["name"], {})[state] = counter["count"]
+
+    for kind, buckets in histograms.items():
+        stats[kind] = _histogram_percentiles(buckets)
+
+    return stats
+
+async def _stream_ndjson(query: str, *args, batch: int = 500):
+    """
+    Streams the rows of a query as newline delimited JSON
+
+    Rows are read through a server side cursor so memory use stays flat no matter how many rows there are
+    """
+    engine = engine_finder()
+    async with engine.pool.acquire() as conn:
+        async with conn.transaction():
+            buf = []
+            async for record in conn.cursor(query, *args, prefetch=batch):
+                buf.append(orjson.dumps(dict(record)))
+                if len(buf) >= batch:
+                    yield b"\n".join(buf) + b"\n"
+                    buf = []
+            if buf:
+                yield b"\n".join(buf) + b"\n"
+
+@app.get("/export/bots", tags=["Export"])
+async def export_bots(js_safe: bool = Depends(snowflakes_as_str)):
+    """
+Exports the whole bot queue as newline delimited JSON (one bot per line, same fields as ``GET /bots``), ordered by ``bot_id``
+
+**Meant for lists mirroring the queue, use ``GET /bots`` for anything else**
+    """
+    text, text_array = ("::text", "::text[]") if js_safe else ("", "")
+    return StreamingResponse(
+        _stream_ndjson(
+            f"""
+            SELECT bot_id{text}, username, banner, description, long_description, website, support, donate, library, 
+            nsfw, prefix, tags, review_note, invite, added_at, state, list_source, owner{text}, extra_owners{text_array}, 
+            reviewer{text}, invite_link, cross_add, updated_at FROM bot_queue ORDER BY bot_id
+            """
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/export/actions", tags=["Export"])
+async def export_actions(since: datetime.datetime | None = None, js_safe: bool = Depends(snowflakes_as_str)):
+    """
+Exports the action log as newline delimited JSON (one action per line, same fields as ``GET /actions``), oldest first
+
+``since`` can be used to only export actions after a given time (such as the time of the last export)
+    """
+    return StreamingResponse(
+        _stream_ndjson(
+            f"""
+            SELECT id, bot_id{'::text' if js_safe else ''}, action, reason, reviewer, action_time, list_source FROM bot_action 
+            WHERE $1::timestamptz IS NULL OR action_time > $1 ORDER BY action_time, id
+            """,
+            since
+        ),
+        media_type="application/x-ndjson"
+    )
+
 good_states = (tables.ListState.PENDING_API_SUPPORT, tables.ListState.SUPPORTED)
 
+def _key_digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()
+
 async def _auth(list_id: uuid.UUID, key: str) -> ORJSONResponse | None:
-    list = await tables.BotList.select(tables.BotList.secret_key, tables.BotList.state).where(tables.BotList.id == list_id).first()
+    # Served from the list registry which is reloaded as soon as a key is reset (see update_list)
+    list = registry.get(list_id)
     if not list:
         return ORJSONResponse({"error": "List not found"}, status_code=404)
-    if key != list["secret_key"]:
+    # Compare fixed length digests in constant time to not leak the key through timing
+    if not hmac.compare_digest(_key_digest(key), _key_digest(list["secret_key"])):
         return ORJSONResponse({"error": "Invalid secret key"}, status_code=401)
     
     if list["state"] not in good_states:
@@ -297,6 +750,63 @@ emotes = {
     "note": "<:activity:912031377422172160>" 
 }
 
+# Discord embed limits
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_FIELD_LIMIT = 1024
+EMBED_TOTAL_LIMIT = 6000
+
+def _queue_lines(e: dict, limit: int) -> str:
+    """The lines describing a newly added bot, the review note is cut so the result fits in ``limit`` characters"""
+    invite = e["invite"]
+    if len(invite) > 512:
+        # Client provided and unbounded, fall back to the default invite
+        invite = f"https://discordapp.com/oauth2/authorize?client_id={e['bot_id']}&scope=bot%20applications.commands&permissions=0"
+
+    base = f"{emotes['id']} {e['bot_id']}\n{emotes['bot']} {e['username']}\n{emotes['crown']} {e['owner']} (<@{e['owner']}>)\n{emotes['invite']} [Invite]({invite})\n{emotes['note']} "
+    note = e["review_note"] or "No review notes for this bot"
+    budget = limit - len(base)
+    if len(note) > budget:
+        note = note[:budget - 3] + "..."
+    return base + note
+
+def _queue_embeds(entries: list[dict]) -> list[discord.Embed]:
+    """
+Builds the queue channel embeds for one or more (coalesced) newly added bots
+
+A single bot gets its own embed, more are packed as one field each into as few embeds as fit Discord's limits
+    """
+    if len(entries) == 1:
+        e = entries[0]
+        return [discord.Embed(url=f"https://metrobots.xyz/bots/{e['bot_id']}", title="Bot Added To Queue", description=_queue_lines(e, EMBED_DESCRIPTION_LIMIT), color=discord.Color.green())]
+
+    chunks: list[list[tuple[str, str]]] = [[]]
+    size = 0
+    budget = EMBED_TOTAL_LIMIT - 32 # Leaves room for the title
+    for e in entries:
+        field = (e["username"][:256], _queue_lines(e, EMBED_FIELD_LIMIT))
+        if chunks[-1] and (size + len(field[0]) + len(field[1]) > budget or len(chunks[-1]) == 25):
+            chunks.append([])
+            size = 0
+        chunks[-1].append(field)
+        size += len(field[0]) + len(field[1])
+
+    embeds = []
+    for chunk in chunks:
+        embed = discord.Embed(title=f"{len(chunk)} Bots Added To Queue" if len(chunk) > 1 else "Bot Added To Queue", color=discord.Color.green())
+        for name, value in chunk:
+            embed.add_field(name=name, value=value, inline=False)
+        embeds.append(embed)
+    return embeds
+
+notifier = QueueNotifier(
+    bot,
+    channel_id=secrets["queue_channel"],
+    content=f"<@&{secrets.get('test_ping_role') or secrets['reviewer']}>",
+    render=_queue_embeds,
+    batch_window=float(secrets.get("queue_notify_window", 2)),
+    max_attempts=int(secrets.get("queue_notify_attempts", 5))
+)
+
 @app.post("/bots")
 async def post_bots(request: Request, _bot: BotPost, list_id: uuid.UUID, auth: str = Depends(auth_header)):
     """
@@ -370,16 +880,14 @@ All optional fields are actually *optional* and does not need to be posted
         _bot.invite = None
         rem.append("invite")
    
-    user = bot.get_user(bot_id)
-    if not user:
-        try:
-            user = await bot.fetch_user(bot_id)
-        except Exception as exc:
-            print(exc)
-            return ORJSONResponse({"error": "Bot does not exist?"}, status_code=400)
+    try:
+        user = await users.get(bot_id)
+    except discord.HTTPException as exc:
+        print(exc)
+        return ORJSONResponse({"error": "Could not look up the bot on discord, try again later"}, status_code=503)
 
-        if not user:
-            return ORJSONResponse({"error": "Bot does not exist?"}, status_code=400)
+    if not user:
+        return ORJSONResponse({"error": "Bot does not exist?"}, status_code=400)
 
     await tables.BotQueue.insert(
         tables.BotQueue(
@@ -411,9 +919,14 @@ All optional fields are actually *optional* and does not need to be posted
         invite = _bot.invite
 
     # TODO: Add bot add propogation in final scope plans if this is successful
-    embed = discord.Embed(url=f"https://metrobots.xyz/bots/{bot_id}", title="Bot Added To Queue", description=f"{emotes['id']} {bot_id}\n{emotes['bot']} {user.name}\n{emotes['crown']} {_bot.owner} (<@{_bot.owner}>)\n{emotes['invite']} [Invite]({invite})\n{emotes['note']} {_bot.review_note or 'No review notes for this bot'}", color=discord.Color.green())
-    c = bot.get_channel(secrets["queue_channel"])
-    await c.send(f"<@&{secrets['test_ping_role'] or secrets['reviewer']}>", embed=embed)
+    # Sent in the background so discord latency never delays the response
+    notifier.put({
+        "bot_id": bot_id,
+        "username": user.name,
+        "owner": owner,
+        "invite": invite,
+        "review_note": _bot.review_note,
+    })
     return {"removed": rem}
 
 class PrefixSupport(discord.ui.View):
@@ -439,6 +952,10 @@ def is_reviewer(interaction: discord.Interaction):
     if interaction.user.id in secrets["owners"]:
         return True
 
+    if roster.ready:
+        return interaction.user.id in roster.reviewers
+
+    # Roster is not built yet, check the guild directly
     if not interaction.guild or interaction.guild.id != secrets["gid"]:
         guild = bot.get_guild(secrets["gid"])
         try:
@@ -488,29 +1005,86 @@ async def invite(interaction: discord.Interaction, bot_id: str):
         return await interaction.response.send_message("Invalid bot id")
     return await interaction.response.send_message(f"https://discord.com/oauth2/authorize?client_id={bot_id}&scope=bot%20applications.commands&permissions=0")
 
+class Paginator(discord.ui.View):
+    """Pages through a list of embeds with previous/next buttons, only usable by ``user_id``"""
+    def __init__(self, pages: list[discord.Embed], user_id: int):
+        self.pages = pages
+        self.page = 0
+        self.user_id = user_id
+        super().__init__(timeout=180)
+        self._update_buttons()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Only the person who ran this command can change pages", ephemeral=True)
+            return False
+        return True
+
+    def _update_buttons(self):
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= len(self.pages) - 1
+
+    async def _show(self, interaction: discord.Interaction):
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.page], view=self)
+
+    @discord.ui.button(label="Previous")
+    async def previous(self, interaction: discord.Interaction, _: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next")
+    async def next(self, interaction: discord.Interaction, _: discord.ui.Button):
+        self.page = min(len(self.pages) - 1, self.page + 1)
+        await self._show(interaction)
+
+def _queue_pages(bots: list[dict], max_len: int = 4000) -> list[discord.Embed]:
+    """Splits bots (ordered by state) into embeds, each within the embed description limit"""
+    counts = {}
+    for bot in bots:
+        counts[bot["state"]] = counts.get(bot["state"], 0) + 1
+
+    pages: list[str] = []
+    page = ""
+    state = None
+    for bot in bots:
+        line = f"{bot['bot_id']} ({bot['username']})\n"
+        if bot["state"] != state:
+            state = bot["state"]
+            header = f"\n**{tables.State(state).name} ({counts[state]})**\n\n"
+        else:
+            header = ""
+        if page and len(page) + len(header) + len(line) > max_len:
+            pages.append(page)
+            page = ""
+            if not header:
+                header = f"**{tables.State(state).name} (continued)**\n\n"
+        page += (header.lstrip("\n") if not page else header) + line
+    if page:
+        pages.append(page)
+
+    return [
+        discord.Embed(title="Bot Queue", description=page, color=discord.Color.blurple()).set_footer(text=f"Page {i + 1}/{len(pages)}")
+        for i, page in enumerate(pages)
+    ]
+
 @bot.tree.command(guild=FSnowflake(id=secrets["gid"]))
 async def queue(interaction: discord.Interaction, show_all: bool = False):
     """Bot queue"""
-    states = {}
-    for state in list(tables.State):
-        if not show_all and state not in (tables.State.PENDING, tables.State.UNDER_REVIEW):
-            continue
-        states[state] = await tables.BotQueue.select(tables.BotQueue.bot_id, tables.BotQueue.username).where(tables.BotQueue.state == state)
-    msg = []
-    msg_index = -1
-    for key, bots in states.items():
-        if not len(bots):
-            continue
-        msg.append(f"**{key.name} ({len(bots)})**\n\n")
-        msg_index += 1
-        for bot in bots:
-            if len(msg) > 1900:
-                msg.append("")
-                msg_index += 1
-            msg[msg_index] += f"{bot['bot_id']} ({bot['username']})\n"
-    await interaction.response.send_message(msg[0])
-    for msg in msg[1:]:
-        await interaction.followup.send(msg)
+    states = list(tables.State) if show_all else [tables.State.PENDING, tables.State.UNDER_REVIEW]
+    bots = await tables.BotQueue.select(
+        tables.BotQueue.bot_id, 
+        tables.BotQueue.username, 
+        tables.BotQueue.state
+    ).where(tables.BotQueue.state.is_in(states)).order_by(tables.BotQueue.state, tables.BotQueue.added_at, ascending=True)
+
+    if not bots:
+        return await interaction.response.send_message("The queue is empty")
+
+    pages = _queue_pages(bots)
+    if len(pages) == 1:
+        return await interaction.response.send_message(embed=pages[0])
+    await interaction.response.send_message(embed=pages[0], view=Paginator(pages, interaction.user.id))
 
 @bot.tree.command(guild=FSnowflake(id=secrets["gid"]))
 async def sync(interaction: discord.Interaction):
@@ -683,11 +1257,48 @@ async def deny(interaction: discord.Interaction):
 @bot.event
 async def on_ready():
     print("Client is now ready and up")
+    guild = bot.get_guild(secrets["gid"])
+    if guild:
+        roster.rebuild(guild)
     await bot.tree.sync()
     await bot.tree.sync(guild=FSnowflake(id=secrets["gid"]))
     for cmd in bot.tree.walk_commands():
         print(cmd.name)
     
+# Keep the team roster up to date
+
+@bot.event
+async def on_member_update(_: discord.Member, after: discord.Member):
+    if after.guild.id == secrets["gid"]:
+        roster.update_member(after)
+
+@bot.event
+async def on_member_join(member: discord.Member):
+    if member.guild.id == secrets["gid"]:
+        roster.update_member(member)
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    if member.guild.id == secrets["gid"]:
+        roster.remove_member(member.id)
+
+@bot.event
+async def on_user_update(_: discord.User, after: discord.User):
+    guild = bot.get_guild(secrets["gid"])
+    member = guild.get_member(after.id) if guild else None
+    if member:
+        roster.update_member(member)
+
+@bot.event
+async def on_guild_role_update(_: discord.Role, after: discord.Role):
+    if after.guild.id == secrets["gid"]:
+        roster.rebuild(after.guild)
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    if role.guild.id == secrets["gid"]:
+        roster.rebuild(role.guild)
+
 @app.get("/littlecloud/{bot_id}")
 async def reapprove_bot(bot_id: int):    
     _bot = await tables.BotQueue.select(tables.BotQueue.state).where(tables.BotQueue.bot_id == bot_id).first()
@@ -751,21 +1362,19 @@ async def deny_bot(bot_id: int, reviewer: int, reason: Reason, list_id: uuid.UUI
 
     return HTMLResponse(res.to_html())
 
-def parse_dict(d: dict | object):
-    """Parse dict for sending over HTTP for a JS client"""
-    if isinstance(d, int):
-        if d > 9007199254740991:
-            return str(d)
-        return d
-    elif isinstance(d, list):
-        return [parse_dict(i) for i in d]
-    elif isinstance(d, dict):
-        nd = {} # New dict
-        for k, v in d.items():
-            nd[k] = parse_dict(v)
-        return nd
-    else:
-        return d        
+# user_id -> (nonce, time it was last checked), avoids a database query on every panel check
+_nonce_cache: dict[int, tuple[str, float]] = {}
+
+async def _check_nonce(user_id: int, nonce: str) -> bool:
+    """Checks that a nonce is the current one of a user, cached for a minute"""
+    cached = _nonce_cache.get(user_id)
+    if cached and cached[0] == nonce and time.time() - cached[1] < 60:
+        return True
+    user = await tables.Users.select(tables.Users.user_id).where(tables.Users.user_id==user_id, tables.Users.nonce==nonce).first()
+    if not user:
+        return False
+    _nonce_cache[user_id] = (nonce, time.time())
+    return True
 
 @app.get("/_panel/mapleshade", tags=["Panel (Internal)"])
 async def get_panel_access(ticket: str):
@@ -778,13 +1387,24 @@ async def get_panel_access(ticket: str):
     if not check_nonce_time(ticket["nonce"]):
         return {"access": False, "hint": "Nonce expiry"}
     ticket["user_id"] = int(ticket["user_id"])
-    user = await tables.Users.select().where(tables.Users.user_id==ticket["user_id"], tables.Users.nonce==ticket["nonce"]).first()
-    if not user:
+    if not await _check_nonce(ticket["user_id"], ticket["nonce"]):
         return {"access": False}
+    if roster.ready:
+        if ticket["user_id"] not in roster.reviewers and ticket["user_id"] not in secrets["owners"]:
+            return {"access": False}
+        name = roster.name(ticket["user_id"]) or getattr(bot.get_user(ticket["user_id"]), "name", "Unknown")
+        return {
+            "access": True, 
+            "member": {
+                "id": str(ticket["user_id"]),
+                "name": name
+            }
+        }
+    # Roster is not built yet, check the guild directly
     guild = bot.get_guild(secrets["gid"])
     if not guild:
         return {"access": False}
-    member = guild.get_member(user["user_id"])
+    member = guild.get_member(ticket["user_id"])
     if not member:
         return {"access": False}
     if discord.utils.get(member.roles, id=secrets["reviewer"]) or member.id in secrets["owners"]:
@@ -797,6 +1417,26 @@ async def get_panel_access(ticket: str):
         }
     return {"access": False}
 
+@app.get("/_panel/silverpelt/health", tags=["Panel (Internal)"])
+async def get_list_health(ticket: str):
+    """
+Returns the rolling health (error rate, latency percentiles and circuit breaker state) of every list Silverpelt has sent to since startup
+    """
+    access = await get_panel_access(ticket)
+    if not access["access"]:
+        return ORJSONResponse(access, status_code=401)
+
+    health = {}
+    for obj in registry.all():
+        if str(obj["id"]) not in silverpelt.health:
+            continue
+        health[str(obj["id"])] = {
+            "name": obj["name"],
+            "domain": obj["domain"],
+            "state": obj["state"],
+        } | silverpelt.health[str(obj["id"])].to_dict()
+
+    return health
 
 @app.get("/_panel/frostpaw", tags=["Panel (Internal)"])
 async def complete_oauth2(request: Request, code: str, state: str):
@@ -808,50 +1448,54 @@ async def complete_oauth2(request: Request, code: str, state: str):
         'client_secret': secrets["client_secret"],
     }
 
-    async with aiohttp.ClientSession() as sess:
-        async with sess.post("https://discord.com/api/v10/oauth2/token", data=payload) as resp:
-            if resp.status != 200:
-                return await resp.json()
-            data = await resp.json()
+    sess = silverpelt.session
 
-            scope = data["scope"].split(" ")
+    async with sess.post("https://discord.com/api/v10/oauth2/token", data=payload) as resp:
+        if resp.status != 200:
+            return await resp.json()
+        data = await resp.json()
 
-            if "identify" not in scope or "guilds" not in scope:
-                return {"error": f"Invalid scopes, got {data['scope']} but have {scope}"}
-            
-            if data["token_type"] != "Bearer":
-                return {"error": f"Invalid token type, got {data['token_type']}"}
-            
+        scope = data["scope"].split(" ")
 
-            # Fetch user info
-            async with sess.get(f"https://discord.com/api/v10/users/@me", headers={"Authorization": f"Bearer {data['access_token']}"}) as resp:
-                if resp.status != 200:
-                    return await resp.json()
-                user = await resp.json()
+        if "identify" not in scope or "guilds" not in scope:
+            return {"error": f"Invalid scopes, got {data['scope']} but have {scope}"}
+        
+        if data["token_type"] != "Bearer":
+            return {"error": f"Invalid token type, got {data['token_type']}"}
+        
+
+        # Fetch user info
+        async with sess.get(f"https://discord.com/api/v10/users/@me", headers={"Authorization": f"Bearer {data['access_token']}"}) as resp:
+            if resp.status != 200:
+                return await resp.json()
+            user = await resp.json()
 
-            # Save the token
-            nonce = _secrets.token_urlsafe() + "@" + str(time.time())
+        # Save the token
+        nonce = _secrets.token_urlsafe() + "@" + str(time.time())
 
-            try:
-                await tables.Users.insert(
-                    tables.Users(
-                        user_id=int(user["id"]),
-                        nonce=nonce
-                    )
+        try:
+            await tables.Users.insert(
+                tables.Users(
+                    user_id=int(user["id"]),
+                    nonce=nonce
                 )
-            except Exception:
-                await tables.Users.update(nonce=nonce).where(tables.Users.user_id == int(user["id"]))
-
-            ticket = {
-                "nonce": nonce,
-                "user_id": str(user["id"]),
-                "username": user["username"], # Ignored during actual auth
-                "disc": user["discriminator"],
-                "avatar": user["avatar"],
-            }
+            )
+        except Exception:
+            await tables.Users.update(nonce=nonce).where(tables.Users.user_id == int(user["id"]))
+
+        # Older nonces of this user are no longer valid
+        _nonce_cache[int(user["id"])] = (nonce, time.time())
+
+        ticket = {
+            "nonce": nonce,
+            "user_id": str(user["id"]),
+            "username": user["username"], # Ignored during actual auth
+            "disc": user["discriminator"],
+            "avatar": user["avatar"],
+        }
 
-            ticket = urlsafe_b64encode(orjson.dumps(ticket)).decode()
+        ticket = urlsafe_b64encode(orjson.dumps(ticket)).decode()
 
-            return RedirectResponse(
-                f"{state}/login?ticket={ticket}"
-            )
+        return RedirectResponse(
+            f"{state}/login?ticket={ticket}"
+        )
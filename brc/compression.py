@@ -0,0 +1,166 @@
+import datetime
+import gzip
+import hashlib
+import zlib
+from typing import Callable, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .responses import is_not_modified, not_modified, validator_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Picks the best encoding the client accepts, brotli is preferred over gzip"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip())
+    if brotli and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+class _StreamCompressor():
+    """Incrementally compresses a streamed response body"""
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=5)
+        else:
+            self._gz = zlib.compressobj(6, zlib.DEFLATED, 31) # 31 means gzip framing
+
+    def process(self, data: bytes) -> bytes:
+        """Compresses a chunk, flushing so the client gets it right away"""
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush()
+
+class CompressionMiddleware():
+    """
+Pure ASGI middleware compressing responses with brotli (if installed) or gzip, based on ``Accept-Encoding``
+
+Responses smaller than ``minimum_size`` or that already have a ``Content-Encoding`` are sent as is,
+streamed responses are compressed chunk by chunk without being buffered
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers:
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor:
+                data = compressor.process(body)
+                if not more_body:
+                    data += compressor.finish()
+                return await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+            headers = MutableHeaders(raw=start["headers"])
+
+            if not more_body:
+                # Whole body is known
+                if len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                await send(start)
+                return await send({"type": "http.response.body", "body": body})
+
+            # Streamed response
+            compressor = _StreamCompressor(encoding)
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            await send(start)
+            await send({"type": "http.response.body", "body": compressor.process(body), "more_body": True})
+
+        await self.app(scope, receive, send_wrapper)
+
+class PrecompressedCache():
+    """
+Caches a serialized payload together with its compressed forms and ETag
+
+The cached bytes are reused until ``version`` changes, so rarely changing payloads are only serialized and compressed once.
+The (weak) ETag is a hash of the payload so it is the same on every worker, conditional requests get a 304 without building anything
+    """
+    def __init__(self, minimum_size: int = 1024):
+        self.minimum_size = minimum_size
+        self._cache: dict[str, tuple[int, str, dict[str, bytes]]] = {}
+
+    def response(
+        self, 
+        key: str, 
+        version: int, 
+        headers: Headers, 
+        build: Callable[[], bytes], 
+        last_modified: Optional[datetime.datetime] = None,
+        media_type: str = "application/json"
+    ) -> Response:
+        cached = self._cache.get(key)
+        if not cached or cached[0] != version:
+            body = build()
+            cached = (version, f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', {"identity": body})
+            self._cache[key] = cached
+
+        _, etag, bodies = cached
+
+        if is_not_modified(headers, etag, last_modified):
+            return not_modified(etag, last_modified)
+
+        resp_headers = validator_headers(etag, last_modified) | {"Vary": "Accept-Encoding"}
+        encoding = negotiate(headers.get("accept-encoding", ""))
+
+        if not encoding or len(bodies["identity"]) < self.minimum_size:
+            return Response(bodies["identity"], media_type=media_type, headers=resp_headers)
+
+        if encoding not in bodies:
+            bodies[encoding] = compress(bodies["identity"], encoding)
+
+        return Response(bodies[encoding], media_type=media_type, headers=resp_headers | {"Content-Encoding": encoding})
@@ -0,0 +1,65 @@
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class CORSMiddleware():
+    """
+Pure ASGI CORS middleware
+
+Preflight (``OPTIONS``) requests are answered directly without reaching the router, other responses get
+the CORS headers added to their start message so bodies are never buffered.
+
+If ``allow_origins`` is None, any origin is allowed (and reflected back), otherwise only the listed ones are
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins: Optional[list[str]] = None,
+        allow_methods: str = "GET, POST, PUT, PATCH, DELETE, OPTIONS",
+        allow_headers: str = "Content-Type, Authorization, Accept",
+        expose_headers: str = "ETag, Last-Modified, X-Next-Cursor",
+        max_age: int = 600,
+    ):
+        self.app = app
+        self.allow_origins = set(allow_origins) if allow_origins is not None else None
+        self.headers = {
+            "Access-Control-Allow-Methods": allow_methods,
+            "Access-Control-Allow-Credentials": "true",
+            "Access-Control-Allow-Headers": allow_headers,
+        }
+        self.expose_headers = expose_headers # Response headers browsers let JS read
+        self.max_age = str(max_age)
+
+    def _allowed(self, origin: Optional[str]) -> bool:
+        return self.allow_origins is None or origin in self.allow_origins
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        origin = Headers(scope=scope).get("origin")
+
+        if scope["method"] == "OPTIONS":
+            if origin and not self._allowed(origin):
+                return await PlainTextResponse("Disallowed CORS origin", status_code=400)(scope, receive, send)
+            response = PlainTextResponse("OK", headers=self.headers | {
+                "Access-Control-Allow-Origin": origin or "*",
+                "Access-Control-Max-Age": self.max_age,
+                "Vary": "Origin",
+            })
+            return await response(scope, receive, send)
+
+        if origin and not self._allowed(origin):
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                headers.update(self.headers)
+                headers["Access-Control-Allow-Origin"] = origin or "*"
+                headers["Access-Control-Expose-Headers"] = self.expose_headers
+                headers.add_vary_header("Origin")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,98 @@
+import asyncio
+from typing import Callable, Optional
+import discord
+
+class QueueNotifier():
+    """
+Sends queue channel notifications in the background so posting a bot never waits on discord
+
+Entries are put on an in-process queue and sent by a single worker. Entries arriving within ``batch_window`` seconds
+of each other are coalesced (up to ``max_batch`` bots) and ``render`` turns them into embeds, each sent as its own message.
+Sends go through the bot's client so discord.py's rate limit handling applies, failed sends are retried with
+exponential backoff up to ``max_attempts`` times before being dropped. Messages discord rejects (4xx other than 429) are not retried
+    """
+    def __init__(
+        self,
+        client: discord.Client,
+        channel_id: int,
+        content: str,
+        render: Callable[[list[dict]], list[discord.Embed]],
+        batch_window: float = 2,
+        max_batch: int = 10,
+        max_attempts: int = 5,
+        max_queued: int = 1000,
+    ):
+        self.client = client
+        self.channel_id = channel_id
+        self.content = content
+        self.render = render
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queued)
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 5):
+        """Gives queued notifications up to ``timeout`` seconds to be sent, then stops the worker"""
+        if not self._worker:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Dropping {self._queue.qsize()} queue notifications on shutdown")
+        self._worker.cancel()
+        self._worker = None
+
+    def put(self, entry: dict):
+        """Queues a notification, never blocks"""
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            print(f"Notification queue full, dropping notification for {entry}")
+
+    async def _next_batch(self) -> list[dict]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send(self, embed: discord.Embed):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                channel = self.client.get_channel(self.channel_id)
+                if not channel:
+                    raise RuntimeError(f"Queue channel {self.channel_id} not found")
+                await channel.send(self.content, embed=embed)
+                return
+            except Exception as exc:
+                if isinstance(exc, discord.HTTPException) and 400 <= exc.status < 500 and exc.status != 429:
+                    # Would fail the same way again
+                    print(f"Queue notification rejected, dropping it: {exc}")
+                    return
+                print(f"Queue notification failed (attempt {attempt}/{self.max_attempts}): {exc}")
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(min(2 ** attempt, 60))
+
+    async def _run(self):
+        await self.client.wait_until_ready()
+        while True:
+            batch = await self._next_batch()
+            try:
+                for embed in self.render(batch):
+                    await self._send(embed)
+            except Exception as exc:
+                print(f"Failed to send queue notifications: {exc}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,24 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T09:14:05:118204"
+VERSION = "0.74.3"
+DESCRIPTION = "Index pending outbox deliveries"
+
+
+async def create_due_index():
+    # Partial index so the outbox worker only scans deliveries that are still pending
+    await engine_finder().run_ddl(
+        "CREATE INDEX IF NOT EXISTS delivery_outbox_due ON delivery_outbox (next_attempt) WHERE state = 0"
+    )
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_due_index)
+
+    return manager
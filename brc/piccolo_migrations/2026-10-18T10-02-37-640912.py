@@ -0,0 +1,43 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T10:02:37:640912"
+VERSION = "0.74.3"
+DESCRIPTION = "Notify workers when a list changes"
+
+
+async def create_notify_trigger():
+    # Lets every worker keep its in-memory list registry up to date (see brc/registry.py)
+    engine = engine_finder()
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION notify_bot_list_changed() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('bot_list_changed', OLD.id::text);
+            ELSE
+                PERFORM pg_notify('bot_list_changed', NEW.id::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    await engine.run_ddl("DROP TRIGGER IF EXISTS bot_list_changed ON bot_list")
+    await engine.run_ddl(
+        """
+        CREATE TRIGGER bot_list_changed AFTER INSERT OR UPDATE OR DELETE ON bot_list
+        FOR EACH ROW EXECUTE FUNCTION notify_bot_list_changed()
+        """
+    )
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_notify_trigger)
+
+    return manager
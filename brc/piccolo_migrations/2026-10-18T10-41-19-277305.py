@@ -0,0 +1,31 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T10:41:19:277305"
+VERSION = "0.74.3"
+DESCRIPTION = "Indexes for paginating and filtering the bot queue"
+
+
+async def create_queue_indexes():
+    # Backs the cursors and filters of GET /bots
+    engine = engine_finder()
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS bot_queue_added_at ON bot_queue (added_at, bot_id)",
+        "CREATE INDEX IF NOT EXISTS bot_queue_state ON bot_queue (state, bot_id)",
+        "CREATE INDEX IF NOT EXISTS bot_queue_list_source ON bot_queue (list_source, bot_id)",
+        "CREATE INDEX IF NOT EXISTS bot_queue_owner ON bot_queue (owner)",
+        "CREATE INDEX IF NOT EXISTS bot_queue_extra_owners ON bot_queue USING GIN (extra_owners)",
+        "CREATE INDEX IF NOT EXISTS bot_queue_tags ON bot_queue USING GIN (tags)",
+    ):
+        await engine.run_ddl(ddl)
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_queue_indexes)
+
+    return manager
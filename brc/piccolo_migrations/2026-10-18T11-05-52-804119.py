@@ -0,0 +1,29 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T11:05:52:804119"
+VERSION = "0.74.3"
+DESCRIPTION = "Indexes for paginating and filtering the action log"
+
+
+async def create_action_indexes():
+    # Backs the cursors and filters of GET /actions
+    engine = engine_finder()
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS bot_action_time ON bot_action (action_time DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS bot_action_bot_id ON bot_action (bot_id, action_time DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS bot_action_list_source ON bot_action (list_source, action_time DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS bot_action_reviewer ON bot_action (reviewer, action_time DESC, id DESC)",
+    ):
+        await engine.run_ddl(ddl)
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_action_indexes)
+
+    return manager
@@ -0,0 +1,39 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T11:48:33:150862"
+VERSION = "0.74.3"
+DESCRIPTION = "Full text search over the bot queue"
+
+
+async def create_search_index():
+    # Used by GET /bots/search, queries must use the same expression for the index to be used
+    engine = engine_finder()
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION bot_queue_search(username text, description text, long_description text, tags text[]) 
+        RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('english'::regconfig, coalesce(username, '')), 'A')
+                || setweight(to_tsvector('english'::regconfig, coalesce(array_to_string(tags, ' '), '')), 'B')
+                || setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+                || setweight(to_tsvector('english'::regconfig, coalesce(long_description, '')), 'C')
+        $$ LANGUAGE sql IMMUTABLE
+        """
+    )
+    await engine.run_ddl(
+        """
+        CREATE INDEX IF NOT EXISTS bot_queue_search ON bot_queue 
+        USING GIN (bot_queue_search(username, description, long_description, tags))
+        """
+    )
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_search_index)
+
+    return manager
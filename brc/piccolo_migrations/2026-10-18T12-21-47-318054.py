@@ -0,0 +1,100 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T12:21:47:318054"
+VERSION = "0.74.3"
+DESCRIPTION = "Maintain queue statistics counters"
+
+
+async def create_counter_trigger():
+    # Keeps queue_counter up to date on every change to bot_queue so GET /stats never scans the queue
+    engine = engine_finder()
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION queue_counter_bump(counter_kind text, counter_name text, counter_state integer, delta bigint) 
+        RETURNS void AS $$
+            INSERT INTO queue_counter (id, kind, name, state, count) 
+            VALUES (counter_kind || ':' || counter_name || ':' || coalesce(counter_state::text, ''), counter_kind, counter_name, counter_state, delta)
+            ON CONFLICT (id) DO UPDATE SET count = queue_counter.count + EXCLUDED.count
+        $$ LANGUAGE sql
+        """
+    )
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION queue_counter_apply(bot bot_queue, delta bigint) RETURNS void AS $$
+        DECLARE
+            tag text;
+        BEGIN
+            PERFORM queue_counter_bump('state', bot.state::text, bot.state, delta);
+            PERFORM queue_counter_bump('list', bot.list_source::text, bot.state, delta);
+            FOR tag IN SELECT DISTINCT unnest(coalesce(bot.tags, '{}')) LOOP
+                PERFORM queue_counter_bump('tag', tag, bot.state, delta);
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Latencies are kept as histograms, the bucket is the upper bound in seconds (-1 for over 30 days)
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION queue_latency_bucket(d interval) RETURNS integer AS $$
+            SELECT coalesce(min(b), -1) FROM unnest(
+                ARRAY[60, 300, 900, 1800, 3600, 10800, 21600, 43200, 86400, 172800, 345600, 604800, 1209600, 2592000]
+            ) AS b WHERE extract(epoch FROM d) <= b
+        $$ LANGUAGE sql IMMUTABLE
+        """
+    )
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION queue_counter_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.state IS NOT DISTINCT FROM NEW.state 
+                AND OLD.list_source IS NOT DISTINCT FROM NEW.list_source 
+                AND OLD.tags IS NOT DISTINCT FROM NEW.tags THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM queue_counter_apply(OLD, -1);
+            END IF;
+            IF TG_OP IN ('UPDATE', 'INSERT') THEN
+                PERFORM queue_counter_apply(NEW, 1);
+            END IF;
+
+            IF TG_OP = 'UPDATE' AND OLD.state IS DISTINCT FROM NEW.state THEN
+                IF OLD.state = 0 AND NEW.state = 1 THEN
+                    PERFORM queue_counter_bump('claim_time', queue_latency_bucket(now() - NEW.added_at)::text, NULL, 1);
+                ELSIF NEW.state IN (2, 3) THEN
+                    PERFORM queue_counter_bump('decision_time', queue_latency_bucket(now() - NEW.added_at)::text, NULL, 1);
+                END IF;
+                IF NEW.reviewer IS NOT NULL THEN
+                    PERFORM queue_counter_bump('reviewer', NEW.reviewer::text, NEW.state, 1);
+                END IF;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    await engine.run_ddl("DROP TRIGGER IF EXISTS queue_counter ON bot_queue")
+    await engine.run_ddl(
+        """
+        CREATE TRIGGER queue_counter AFTER INSERT OR DELETE OR UPDATE OF state, list_source, tags ON bot_queue
+        FOR EACH ROW EXECUTE FUNCTION queue_counter_trigger()
+        """
+    )
+    # Backfill the current queue, latencies and reviewer counts start from now
+    await engine.run_ddl("DELETE FROM queue_counter WHERE kind IN ('state', 'list', 'tag')")
+    await engine.run_ddl("SELECT queue_counter_apply(bot_queue, 1) FROM bot_queue")
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_counter_trigger)
+
+    return manager
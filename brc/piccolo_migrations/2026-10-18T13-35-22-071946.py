@@ -0,0 +1,40 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T13:35:22:071946"
+VERSION = "0.74.3"
+DESCRIPTION = "Keep updated_at current"
+
+
+async def create_updated_at_triggers():
+    # Covers every write (including the admin panel), used for ETag and Last-Modified headers
+    engine = engine_finder()
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in ("bot_list", "bot_queue"):
+        await engine.run_ddl(f"DROP TRIGGER IF EXISTS {table}_updated_at ON {table}")
+        await engine.run_ddl(
+            f"""
+            CREATE TRIGGER {table}_updated_at BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+            """
+        )
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(create_updated_at_triggers)
+
+    return manager
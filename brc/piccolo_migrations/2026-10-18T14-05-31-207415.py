@@ -0,0 +1,30 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T14:05:31:207415"
+VERSION = "0.74.3"
+DESCRIPTION = "Store the bot queue search vector"
+
+
+async def store_search_vector():
+    # Ranking needs the tsvector of every match, storing it means it is not rebuilt from the (long) descriptions per query
+    engine = engine_finder()
+    await engine.run_ddl(
+        """
+        ALTER TABLE bot_queue ADD COLUMN IF NOT EXISTS search tsvector 
+        GENERATED ALWAYS AS (bot_queue_search(username, description, long_description, tags)) STORED
+        """
+    )
+    await engine.run_ddl("DROP INDEX IF EXISTS bot_queue_search")
+    await engine.run_ddl("CREATE INDEX IF NOT EXISTS bot_queue_search_vector ON bot_queue USING GIN (search)")
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(store_search_vector)
+
+    return manager
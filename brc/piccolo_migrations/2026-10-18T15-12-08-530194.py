@@ -0,0 +1,55 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.engine import engine_finder
+
+
+ID = "2026-10-18T15:12:08:530194"
+VERSION = "0.74.3"
+DESCRIPTION = "Count reviewer actions by the acting reviewer"
+
+
+async def recreate_counter_trigger():
+    # Reviewer counters are now bumped by Silverpelt with the reviewer taking the action, 
+    # the trigger only sees bot_queue.reviewer which is whoever claimed the bot
+    engine = engine_finder()
+    await engine.run_ddl(
+        """
+        CREATE OR REPLACE FUNCTION queue_counter_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.state IS NOT DISTINCT FROM NEW.state 
+                AND OLD.list_source IS NOT DISTINCT FROM NEW.list_source 
+                AND OLD.tags IS NOT DISTINCT FROM NEW.tags THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM queue_counter_apply(OLD, -1);
+            END IF;
+            IF TG_OP IN ('UPDATE', 'INSERT') THEN
+                PERFORM queue_counter_apply(NEW, 1);
+            END IF;
+
+            IF TG_OP = 'UPDATE' AND OLD.state IS DISTINCT FROM NEW.state THEN
+                IF OLD.state = 0 AND NEW.state = 1 THEN
+                    PERFORM queue_counter_bump('claim_time', queue_latency_bucket(now() - NEW.added_at)::text, NULL, 1);
+                ELSIF NEW.state IN (2, 3) THEN
+                    PERFORM queue_counter_bump('decision_time', queue_latency_bucket(now() - NEW.added_at)::text, NULL, 1);
+                END IF;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Counted per claimant until now, start over
+    await engine.run_ddl("DELETE FROM queue_counter WHERE kind = 'reviewer'")
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="brc", description=DESCRIPTION
+    )
+
+    manager.add_raw(recreate_counter_trigger)
+
+    return manager
@@ -0,0 +1,119 @@
+import asyncio
+import uuid
+from typing import Optional
+from piccolo.engine import engine_finder
+from .tables import BotList
+
+class ListRegistry():
+    """
+In-memory copy of every ``BotList`` row
+
+Loaded on startup and kept up to date by a postgres trigger that sends a ``NOTIFY`` on the
+``bot_list_changed`` channel whenever a list is added, changed or removed (including through the admin panel),
+so every worker stays consistent without querying ``bot_list`` on hot paths
+    """
+    channel = "bot_list_changed"
+
+    def __init__(self, refresh: float = 300):
+        self.refresh = refresh # Full reload interval (in seconds) in case a notification is missed
+        self._lists: dict[str, dict] = {}
+        self.version = 0 # Bumped whenever a list changes
+        self._conn = None
+        self._tasks: set[asyncio.Task] = set()
+        self._refresher: Optional[asyncio.Task] = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        # Loads and reloads run one at a time (in the order they were started) so an older read never replaces a newer one
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Loads all lists and starts listening for changes, must be called after the database pool is open"""
+        await self._listen()
+        await self.load()
+        self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._refresher:
+            self._refresher.cancel()
+            self._refresher = None
+        if self._reconnecting:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        if self._conn:
+            conn, self._conn = self._conn, None
+            conn.remove_termination_listener(self._on_terminate)
+            await conn.close()
+
+    async def _listen(self):
+        conn = await engine_finder().get_new_connection()
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminate)
+        self._conn = conn
+
+    def _on_terminate(self, conn):
+        # The listening connection was lost, notifications sent until it is back would be missed
+        if conn is not self._conn:
+            return
+        self._conn = None
+        if not self._reconnecting:
+            print("Lost list registry listener connection, reconnecting")
+            self._reconnecting = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Listens again and reloads every list to catch up on changes missed while disconnected"""
+        attempt = 0
+        try:
+            while True:
+                try:
+                    await self._listen()
+                    await self.load()
+                    if self._conn:
+                        return
+                    # Lost again while reloading
+                except Exception as exc:
+                    print("Failed to reconnect list registry listener:", exc)
+                    if self._conn:
+                        conn, self._conn = self._conn, None
+                        conn.remove_termination_listener(self._on_terminate)
+                        conn.terminate()
+                attempt += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+        finally:
+            self._reconnecting = None
+
+    async def load(self):
+        """Reloads every list"""
+        async with self._lock:
+            lists = await BotList.select()
+            self._lists = {str(obj["id"]): obj for obj in lists}
+            self.version += 1
+
+    async def reload(self, list_id: uuid.UUID | str):
+        """Reloads a single list, removing it if it no longer exists"""
+        async with self._lock:
+            obj = await BotList.select().where(BotList.id == list_id).first()
+            if obj:
+                self._lists[str(list_id)] = obj
+            else:
+                self._lists.pop(str(list_id), None)
+            self.version += 1
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        task = asyncio.create_task(self.reload(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh)
+            try:
+                await self.load()
+            except Exception as exc:
+                print("Failed to refresh list registry:", exc)
+
+    def get(self, list_id: uuid.UUID | str) -> Optional[dict]:
+        """Returns a list by id"""
+        return self._lists.get(str(list_id))
+
+    def all(self) -> list[dict]:
+        """Returns all lists ordered by id"""
+        return sorted(self._lists.values(), key=lambda obj: str(obj["id"]))
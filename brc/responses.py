@@ -0,0 +1,87 @@
+import datetime
+import enum
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+import orjson
+from fastapi import Header
+from fastapi.responses import ORJSONResponse, Response
+from starlette.datastructures import Headers
+
+JS_MAX_SAFE_INTEGER = 9007199254740991
+
+# Fields holding discord snowflakes
+SNOWFLAKE_FIELDS = ("bot_id", "owner", "reviewer")
+SNOWFLAKE_LIST_FIELDS = ("extra_owners",)
+
+class SnowflakeFormat(enum.Enum):
+    string = "string"
+    int = "int"
+
+def snowflakes_as_str(snowflakes: SnowflakeFormat = SnowflakeFormat.string, x_snowflakes: SnowflakeFormat | None = Header(None)) -> bool:
+    """
+Dependency returning whether snowflakes should be sent as strings (the default, as JS cannot represent them as numbers)
+
+Clients that can handle 64 bit integers can ask for them with ``?snowflakes=int`` or a ``X-Snowflakes: int`` header
+to skip the conversion
+    """
+    return (x_snowflakes or snowflakes) == SnowflakeFormat.string
+
+def stringify_snowflakes(row: dict) -> dict:
+    """Converts the snowflake fields of a row to strings in place"""
+    for name in SNOWFLAKE_FIELDS:
+        if row.get(name) is not None:
+            row[name] = str(row[name])
+    for name in SNOWFLAKE_LIST_FIELDS:
+        if row.get(name) is not None:
+            row[name] = [str(v) for v in row[name]]
+    return row
+
+def _stringify_big_ints(d: Any) -> Any:
+    if isinstance(d, int) and not isinstance(d, bool):
+        return str(d) if abs(d) > JS_MAX_SAFE_INTEGER else d
+    elif isinstance(d, list):
+        return [_stringify_big_ints(i) for i in d]
+    elif isinstance(d, dict):
+        return {k: _stringify_big_ints(v) for k, v in d.items()}
+    return d
+
+class JSSafeResponse(ORJSONResponse):
+    """
+ORJSON response that never sends integers a JS client would lose precision on
+
+Encoding uses orjson's strict integer mode, so checking for unsafe integers happens natively in the same pass.
+Only if one is found (a snowflake that was not already converted) is the content walked and re-encoded
+    """
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_STRICT_INTEGER | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return orjson.dumps(_stringify_big_ints(content), option=orjson.OPT_NON_STR_KEYS)
+
+def http_date(dt: datetime.datetime) -> str:
+    return format_datetime(dt.astimezone(datetime.timezone.utc), usegmt=True)
+
+def is_not_modified(headers: Headers, etag: str, last_modified: Optional[datetime.datetime] = None) -> bool:
+    """Checks ``If-None-Match`` (or ``If-Modified-Since`` if it is not set) against a resource"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison as the body may be compressed differently
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def validator_headers(etag: str, last_modified: Optional[datetime.datetime] = None) -> dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def not_modified(etag: str, last_modified: Optional[datetime.datetime] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
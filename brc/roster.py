@@ -0,0 +1,71 @@
+from typing import Optional
+import discord
+import orjson
+
+class Roster():
+    """
+In-memory index of the review team in the home guild
+
+Built once when the bot is ready and kept up to date from gateway events (member updates, joins, leaves and role changes)
+so checking if someone is a reviewer or building ``/team`` never scans the guild
+    """
+    def __init__(self, gid: int, reviewer: int, list_owner: int, sudo: int):
+        self.gid = gid
+        self.reviewer_role = reviewer
+        self.list_owner_role = list_owner
+        self.sudo_role = sudo
+        self.ready = False
+        self.reviewers: set[int] = set()
+        self.list_owners: set[int] = set()
+        self.sudo: set[int] = set()
+        self._team: dict[int, dict] = {}
+        self._snapshot: Optional[bytes] = None
+
+    def rebuild(self, guild: discord.Guild):
+        """Rebuilds the roster from all members of the guild"""
+        self.reviewers, self.list_owners, self.sudo = set(), set(), set()
+        self._team = {}
+        for member in guild.members:
+            self.update_member(member)
+        self.ready = True
+
+    def update_member(self, member: discord.Member):
+        """Updates the roster entry of a member after their roles or profile changed"""
+        self.remove_member(member.id)
+
+        role_ids = {role.id for role in member.roles}
+
+        if self.list_owner_role in role_ids:
+            self.list_owners.add(member.id)
+        if self.sudo_role in role_ids:
+            self.sudo.add(member.id)
+        if self.reviewer_role not in role_ids:
+            return
+
+        self.reviewers.add(member.id)
+        self._team[member.id] = {
+            "username": member.name,
+            "id": str(member.id),
+            "avatar": (member.avatar or member.default_avatar).url,
+            "is_list_owner": member.id in self.list_owners,
+            "sudo": member.id in self.sudo,
+            "roles": [role.name for role in member.roles if "list" in role.name.lower() and not role.name.lower().startswith("list")],
+        }
+
+    def name(self, id: int) -> Optional[str]:
+        """Returns the username of a reviewer"""
+        member = self._team.get(id)
+        return member["username"] if member else None
+
+    def remove_member(self, id: int):
+        self.reviewers.discard(id)
+        self.list_owners.discard(id)
+        self.sudo.discard(id)
+        self._team.pop(id, None)
+        self._snapshot = None
+
+    def snapshot(self) -> bytes:
+        """Returns the team as serialized JSON, only rebuilt after the roster changes"""
+        if self._snapshot is None:
+            self._snapshot = orjson.dumps(list(self._team.values()))
+        return self._snapshot
@@ -1,6 +1,14 @@
+import asyncio
+import datetime
+import random
+import ssl
+import time
+import uuid
+from collections import deque
 from pydantic import BaseModel
 from typing import Optional, Any
-from .tables import BotQueue, Action, State, BotList, ListState
+from .tables import BotQueue, Action, State, ListState, DeliveryOutbox, DeliveryState
+from .registry import ListRegistry
 import aiohttp
 import orjson
 
@@ -25,6 +33,7 @@ class SilverpeltHTTP(BaseModel):
     data: dict
     url: str
     key: str
+    list_id: Optional[str] = None # Used to track list health
 
 class SilverpeltHttpResponse(BaseModel):
     """A Silverpelt HTTP response"""
@@ -33,6 +42,7 @@ class SilverpeltHttpResponse(BaseModel):
     data: Any
     exc: Optional[str] = None
     sent_data: dict
+    deferred: bool = False # Not sent as the circuit breaker of the list is open
 
 class SilverpeltResponse(BaseModel):
     """
@@ -61,10 +71,104 @@ Response to a silverpelt request
         """
         return str(self)
 
+class ListHealth():
+    """
+Rolling health of a list and its circuit breaker
+
+- closed: requests are sent as normal
+- open: the list failed ``threshold`` times in a row, requests fail fast until ``cooldown`` seconds have passed
+- half_open: a single probe request is let through, closing the circuit on success and reopening it on failure
+    """
+    def __init__(self, threshold: int, cooldown: float, window: int):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.results: deque[tuple[bool, float]] = deque(maxlen=window) # (ok, latency in seconds)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+    
+    def allow(self) -> bool:
+        """Whether a request may be sent to the list right now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, ok: bool, latency: float):
+        """Records the result of a request to the list"""
+        self.results.append((ok, latency))
+        self.probing = False
+        if ok:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            return
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= self.threshold:
+            # Failed probe or too many failures, (re)open the circuit
+            self.opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit will let a probe through"""
+        if self.opened_at is None:
+            return 0
+        return max(0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def to_dict(self) -> dict:
+        latencies = sorted(latency for _, latency in self.results)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[int(p * (len(latencies) - 1))] * 1000, 2)
+
+        return {
+            "state": self.state,
+            "requests": len(self.results),
+            "error_rate": round(sum(not ok for ok, _ in self.results) / len(self.results), 4) if self.results else 0,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+            },
+            "retry_in": round(self.retry_in(), 2),
+        }
+
 class Silverpelt():
     """Core heart of metro reviews"""
-    def __init__(self, secrets: dict[str, str]):
+    def __init__(self, secrets: dict[str, str], registry: ListRegistry):
         self.secrets = secrets
+        self.registry = registry
+        # Max number of lists to send to at once and the deadline (in seconds) for a whole action
+        self.concurrency = int(secrets.get("silverpelt_concurrency", 10))
+        self.deadline = float(secrets.get("silverpelt_deadline", 45))
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Outbox retry policy, delays are in seconds
+        self.max_attempts = int(secrets.get("outbox_max_attempts", 8))
+        self.retry_base = float(secrets.get("outbox_retry_base", 5))
+        self.retry_cap = float(secrets.get("outbox_retry_cap", 3600))
+        self.outbox_batch = int(secrets.get("outbox_batch", 50))
+        self.outbox_poll = float(secrets.get("outbox_poll", 5))
+        # Delivered and failed rows older than this (in seconds) are deleted
+        self.outbox_retention = float(secrets.get("outbox_retention", 7 * 24 * 60 * 60))
+        self._last_prune = 0.0
+        self._worker: Optional[asyncio.Task] = None
+        # Per list circuit breakers
+        self.breaker_threshold = int(secrets.get("breaker_threshold", 5))
+        self.breaker_cooldown = float(secrets.get("breaker_cooldown", 60))
+        self.health_window = int(secrets.get("health_window", 100))
+        self.health: dict[str, ListHealth] = {}
         self.good_states = (ListState.PENDING_API_SUPPORT, ListState.SUPPORTED)
         self._actions = {
             Action.CLAIM: SilverpeltAction(
@@ -93,102 +197,385 @@ class Silverpelt():
             )
         }
     
+    async def start(self):
+        """
+        Opens the shared HTTP client pool, must be called on startup
+
+        Connections are kept alive per host and DNS lookups are cached, a single SSL context is 
+        shared so TLS sessions can be reused across requests to the same list
+        """
+        if self._session and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=int(self.secrets.get("http_pool_size", 100)),
+            limit_per_host=int(self.secrets.get("http_pool_per_host", 10)),
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+            ssl=ssl.create_default_context(),
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": "Frostpaw/0.2 (Silverpelt)"},
+            json_serialize=lambda obj: orjson.dumps(obj).decode(),
+        )
+        self._worker = asyncio.create_task(self.outbox_worker())
+
+    async def close(self):
+        """Closes the shared HTTP client pool and stops the outbox worker, must be called on shutdown"""
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared HTTP client session"""
+        if not self._session or self._session.closed:
+            raise RuntimeError("Silverpelt HTTP pool is not open, call start() first")
+        return self._session
+
     async def _make_request(self, data: SilverpeltHTTP) -> SilverpeltHttpResponse: 
         if not data.url or not data.url.startswith("https://"):
             return SilverpeltHttpResponse(status=400, msg="No url provided", data=None, exc=None, sent_data=data.data)
 
         print(data.url)
 
-        async with aiohttp.ClientSession() as sess:
-            async with sess.post(
-                data.url, 
-                headers={"Authorization": data.key, "User-Agent": "Frostpaw/0.2 (Silverpelt)", "Content-Type": "application/json"},
-                json=data.data,
-                timeout=30
-            ) as resp:
-                try:
-                    json_d = await resp.text()
-                except Exception as exc:
+        async with self.session.post(
+            data.url, 
+            headers={"Authorization": data.key, "Content-Type": "application/json"},
+            json=data.data,
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as resp:
+            try:
+                json_d = await resp.text()
+            except Exception as exc:
+                return SilverpeltHttpResponse(
+                    status=resp.status, 
+                    msg="Failed to parse response", 
+                    data=None, 
+                    exc=str(exc),
+                    sent_data=data.data
+                )
+            
+            return SilverpeltHttpResponse(
+                status=resp.status,
+                msg="Success",
+                data=json_d,
+                sent_data=data.data,
+            )
+
+    def health_of(self, list_id: str) -> ListHealth:
+        """Returns the health of a list, creating it if needed"""
+        list_id = str(list_id)
+        if list_id not in self.health:
+            self.health[list_id] = ListHealth(self.breaker_threshold, self.breaker_cooldown, self.health_window)
+        return self.health[list_id]
+
+    async def _send_all(self, reqs: dict[str, SilverpeltHTTP]) -> dict[str, SilverpeltHttpResponse]:
+        """
+        Sends all requests concurrently (at most ``concurrency`` at a time)
+
+        Lists that have not responded by the time ``deadline`` is hit are cancelled and reported as timed out
+        """
+        if not reqs:
+            return {}
+
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _send(req: SilverpeltHTTP) -> SilverpeltHttpResponse:
+            if not req.list_id or not req.url or not req.url.startswith("https://"):
+                async with sem:
+                    return await self._make_request(req)
+
+            health = self.health_of(req.list_id)
+
+            async with sem:
+                # Only checked once a slot is free, a probe must never be let through (and marked as running)
+                # while still waiting here as it would not be recorded if the deadline cancels the wait
+                if not health.allow():
                     return SilverpeltHttpResponse(
-                        status=resp.status, 
-                        msg="Failed to parse response", 
+                        status=503, 
+                        msg="List is failing, circuit open, delivery deferred", 
                         data=None, 
-                        exc=str(exc),
-                        sent_data=data.data
+                        sent_data=req.data,
+                        deferred=True
                     )
-                
-                return SilverpeltHttpResponse(
-                    status=resp.status,
-                    msg="Success",
-                    data=json_d,
-                    sent_data=data.data,
+
+                start = time.monotonic()
+                try:
+                    resp = await self._make_request(req)
+                except BaseException:
+                    # Includes cancellation when the deadline is hit
+                    health.record(False, time.monotonic() - start)
+                    raise
+                health.record(not self._retryable(resp.status), time.monotonic() - start)
+                return resp
+
+        tasks = {name: asyncio.create_task(_send(req)) for name, req in reqs.items()}
+
+        _, pending = await asyncio.wait(tasks.values(), timeout=self.deadline)
+
+        for task in pending:
+            task.cancel()
+
+        list_resp: dict[str, SilverpeltHttpResponse] = {}
+
+        for name, task in tasks.items():
+            if task in pending:
+                list_resp[name] = SilverpeltHttpResponse(
+                    status=408, 
+                    msg="Deadline exceeded", 
+                    data=None, 
+                    sent_data=reqs[name].data
                 )
+            elif task.exception():
+                list_resp[name] = SilverpeltHttpResponse(
+                    status=502, 
+                    msg="Request failed", 
+                    data=None, 
+                    exc=str(task.exception()),
+                    sent_data=reqs[name].data
+                )
+            else:
+                list_resp[name] = task.result()
+        
+        return list_resp
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff (with jitter) before the next attempt of a delivery"""
+        delay = min(self.retry_cap, self.retry_base * 2 ** attempts)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def _retryable(status: int) -> bool:
+        """Whether a failed delivery is worth retrying (timeouts, rate limits, server and network errors)"""
+        return status in (408, 429) or status >= 500
+
+    async def _record(self, id: uuid.UUID, list_id: uuid.UUID, attempts: int, resp: SilverpeltHttpResponse):
+        """Records how a delivery attempt ended in the outbox, scheduling a retry if needed"""
+        if resp.deferred:
+            # Circuit is open, try again once it lets a probe through without using up an attempt
+            retry_in = self.health_of(list_id).retry_in() + 1
+            await DeliveryOutbox.update({
+                DeliveryOutbox.state: DeliveryState.PENDING,
+                DeliveryOutbox.next_attempt: datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=retry_in),
+                DeliveryOutbox.last_status: resp.status,
+                DeliveryOutbox.last_error: resp.msg,
+            }).where(DeliveryOutbox.id == id)
+            return
+
+        attempts += 1
+
+        if 200 <= resp.status < 300:
+            state = DeliveryState.DELIVERED
+        elif self._retryable(resp.status) and attempts < self.max_attempts:
+            state = DeliveryState.PENDING
+        else:
+            state = DeliveryState.FAILED
+        
+        await DeliveryOutbox.update({
+            DeliveryOutbox.state: state,
+            DeliveryOutbox.attempts: attempts,
+            DeliveryOutbox.next_attempt: datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=self._backoff(attempts)),
+            DeliveryOutbox.last_status: resp.status,
+            DeliveryOutbox.last_error: None if state == DeliveryState.DELIVERED else str(resp.exc or resp.data or resp.msg)[:2000],
+        }).where(DeliveryOutbox.id == id)
+
+    async def _claim_due(self) -> list[dict]:
+        """
+        Claims a batch of due deliveries from the outbox
+
+        Claimed rows are leased by pushing ``next_attempt`` past the action deadline so other workers skip them
+        """
+        return await DeliveryOutbox.raw(
+            """
+            UPDATE delivery_outbox SET next_attempt = now() + make_interval(secs => {})
+            WHERE id IN (
+                SELECT id FROM delivery_outbox 
+                WHERE state = {} AND next_attempt <= now() 
+                ORDER BY next_attempt LIMIT {} 
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, bot_id, action, list_id, payload, attempts
+            """,
+            self.deadline * 2,
+            int(DeliveryState.PENDING),
+            self.outbox_batch,
+        )
+
+    async def _deliver(self, rows: list[dict]):
+        """Retries a batch of claimed outbox deliveries using the current config of each list"""
+        reqs: dict[str, SilverpeltHTTP] = {}
+        list_resp: dict[str, SilverpeltHttpResponse] = {}
+
+        for row in rows:
+            payload = orjson.loads(row["payload"]) if isinstance(row["payload"], str) else row["payload"]
+            obj = self.registry.get(row["list_id"])
+            if not obj or obj["state"] not in self.good_states:
+                list_resp[str(row["id"])] = SilverpeltHttpResponse(status=410, msg="List is no longer active", data=None, sent_data=payload)
+                continue
+            reqs[str(row["id"])] = SilverpeltHTTP(
+                url=obj[self._actions[Action(row["action"])].list_key],
+                key=obj["secret_key"],
+                data=payload,
+                list_id=str(row["list_id"]),
+            )
+        
+        list_resp |= await self._send_all(reqs)
+
+        await asyncio.gather(*(self._record(row["id"], row["list_id"], row["attempts"], list_resp[str(row["id"])]) for row in rows))
+
+    async def _prune(self):
+        """Deletes finished deliveries past the retention period, at most once an hour"""
+        if time.monotonic() - self._last_prune < 3600:
+            return
+        self._last_prune = time.monotonic()
+        await DeliveryOutbox.raw(
+            "DELETE FROM delivery_outbox WHERE state <> {} AND created_at < now() - make_interval(secs => {})",
+            int(DeliveryState.PENDING),
+            self.outbox_retention,
+        )
+
+    async def outbox_worker(self):
+        """Background task that retries pending list deliveries from the outbox and prunes finished ones"""
+        while True:
+            try:
+                await self._prune()
+                rows = await self._claim_due()
+                if rows:
+                    await self._deliver(rows)
+                    # There may be more due, so don't sleep
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print("Outbox worker failed:", exc)
+            
+            await asyncio.sleep(self.outbox_poll)
+
+    async def _transition(self, data: SilverpeltRequest, action: SilverpeltAction, list_ids: list[str]) -> Optional[list[dict]]:
+        """
+        Atomically moves a bot to the new state of an action and queues its deliveries in a single statement
+
+        The state check is part of the UPDATE so two reviewers racing on the same bot cannot both succeed.
+        The outbox rows (one per list in ``list_ids`` that still exists) are inserted by the same statement, so a
+        state change is never committed without its deliveries. New rows are leased past the action deadline so 
+        the outbox worker leaves them alone until the inline attempt is recorded. If the state changed, the reviewer
+        counter of ``/stats`` is bumped for the reviewer taking the action (the trigger on ``bot_queue`` only knows the claimant).
+
+        Returns None if the bot does not exist or is not in an allowed state, otherwise one row per queued delivery 
+        (or a single row with a null ``outbox_id`` if there was nothing to deliver)
+        """
+        sets = ["state = {}"]
+        args: list[Any] = [int(action.new_state)]
+
+        if data.action == Action.CLAIM and not data.resend:
+            sets.append("reviewer = {}")
+            args.append(data.reviewer)
+
+        # Locked so the previous state is the one being replaced
+        args.append(data.bot_id)
+
+        where = "b.bot_id = {}"
+        args.append(data.bot_id)
+
+        if not data.resend:
+            where += " AND b.state = ANY({}::integer[])"
+            args.append([int(state) for state in action.allowed_states])
+
+        # Arguments of the reviewer counter and outbox inserts, in the order of their placeholders
+        args += [
+            str(data.reviewer),
+            data.bot_id,
+            int(data.action),
+            str(data.bot_id),
+            str(data.reviewer),
+            data.reason or "No reason provided",
+            self.deadline * 2,
+            [uuid.uuid4() for _ in list_ids],
+            [uuid.UUID(list_id) for list_id in list_ids],
+        ]
+
+        rows = await BotQueue.raw(
+            f"""
+            WITH t AS (
+                UPDATE bot_queue AS b SET {', '.join(sets)} 
+                FROM (SELECT state FROM bot_queue WHERE bot_id = {{}} FOR UPDATE) AS old
+                WHERE {where} 
+                RETURNING b.state, old.state AS old_state, b.list_source, b.cross_add
+            ), r AS (
+                INSERT INTO queue_counter (id, kind, name, state, count)
+                SELECT 'reviewer:' || reviewer.name || ':' || t.state, 'reviewer', reviewer.name, t.state, 1
+                FROM t, (SELECT {{}}::text AS name) AS reviewer
+                WHERE t.old_state IS DISTINCT FROM t.state
+                ON CONFLICT (id) DO UPDATE SET count = queue_counter.count + 1
+            ), o AS (
+                INSERT INTO delivery_outbox (id, bot_id, action, list_id, payload, next_attempt)
+                SELECT d.id, {{}}::bigint, {{}}::integer, d.list_id, jsonb_build_object(
+                    'bot_id', {{}}::text, 
+                    'can_add', d.list_id = t.list_source OR t.cross_add, 
+                    'reviewer', {{}}::text, 
+                    'reason', {{}}::text
+                ), now() + make_interval(secs => {{}})
+                FROM t, unnest({{}}::uuid[], {{}}::uuid[]) AS d(id, list_id)
+                -- Skips lists deleted since the registry last saw them instead of failing on the foreign key
+                WHERE EXISTS (SELECT 1 FROM bot_list WHERE bot_list.id = d.list_id)
+                RETURNING id, list_id, payload
+            )
+            SELECT t.state, t.list_source, t.cross_add, o.id AS outbox_id, o.list_id, o.payload FROM t LEFT JOIN o ON true
+            """,
+            *args
+        )
+
+        return rows or None
 
     async def request(self, data: SilverpeltRequest) -> Optional[SilverpeltResponse]:
         """Asks silverpelt to handle a action"""
         if len(data.reason) < 5:
             return SilverpeltResponse(message="Reason must be at least 5 characters")
 
-        bot = await BotQueue.select("state", "list_source").where(BotQueue.bot_id == data.bot_id).first()
-
-        if not bot:
-            return SilverpeltResponse(message="Bot not found")
-        
         action = self._actions[data.action]
 
-        if not data.resend:
-            # Check if state is banned
-            if bot["state"] not in action.allowed_states:
-                return SilverpeltResponse(message=action.error)
-
-        if action == Action.CLAIM and not data.resend:
-            await BotQueue.update(reviewer=data.reviewer).where(BotQueue.bot_id == data.bot_id)
+        # Keyed by list id as display names are not unique
+        lists = {
+            str(obj["id"]): obj for obj in self.registry.all() 
+            if obj["state"] in self.good_states and (not data.lists or str(obj["id"]) in data.lists)
+        }
 
-        # Update state
-        await BotQueue.update(state=action.new_state).where(BotQueue.bot_id == data.bot_id)
+        rows = await self._transition(data, action, list(lists))
 
-        lists = await BotList.select(BotList.id, BotList.name, BotList.domain, BotList.state, action.list_key, BotList.secret_key)
+        if not rows:
+            # Cold path, find out why the transition did not happen
+            curr = await BotQueue.select(BotQueue.state, BotQueue.reviewer).where(BotQueue.bot_id == data.bot_id).first()
+            if not curr:
+                return SilverpeltResponse(message="Bot not found")
+            # Bots claimed before the reviewer was stored have none
+            if data.action == Action.CLAIM and curr["state"] == State.UNDER_REVIEW and curr["reviewer"]:
+                return SilverpeltResponse(message=f"This bot has already been claimed by <@{curr['reviewer']}>")
+            return SilverpeltResponse(message=action.error)
 
-        list_resp: dict[str, SilverpeltHttpResponse] = {}
+        reqs: dict[str, SilverpeltHTTP] = {}
+        outbox_ids: dict[str, uuid.UUID] = {}
 
-        for obj in lists:
-            name = str(obj["domain"] or obj["name"] or obj["id"])
-            if obj["state"] not in self.good_states:
-                continue
-            if data.lists and str(obj["id"]) not in data.lists:
-                continue
-            if str(obj["id"]) != str(bot["list_source"]) and not bot["cross_add"]:
-                list_resp[name] = (
-                    await self._make_request(
-                        SilverpeltHTTP(
-                            url=obj[action.list_key],
-                            key=obj["secret_key"],
-                            data = {
-                                "bot_id": str(data.bot_id), 
-                                "can_add": False,
-                                "reviewer": str(data.reviewer), 
-                                "reason": data.reason or "No reason provided",
-                            },
-                        )
-                    )
-                )
+        for row in rows:
+            if not row["outbox_id"]:
                 continue
-            list_resp[name] = (
-                await self._make_request(
-                    SilverpeltHTTP(
-                        url=obj[action.list_key],
-                        key=obj["secret_key"],
-                        data = {
-                            "bot_id": str(data.bot_id), 
-                            "can_add": True,
-                            "reviewer": str(data.reviewer), 
-                            "reason": data.reason or "No reason provided",
-                        },
-                    )
-                )
+            list_id = str(row["list_id"])
+            obj = lists[list_id]
+            reqs[list_id] = SilverpeltHTTP(
+                url=obj[action.list_key],
+                key=obj["secret_key"],
+                data=orjson.loads(row["payload"]) if isinstance(row["payload"], str) else row["payload"],
+                list_id=list_id,
             )
+            outbox_ids[list_id] = row["outbox_id"]
+
+        list_resp = await self._send_all(reqs)
+
+        await asyncio.gather(*(self._record(outbox_ids[list_id], list_id, 0, resp) for list_id, resp in list_resp.items()))
         
         return SilverpeltResponse(
-            lists=list_resp
+            lists={str(lists[list_id]["domain"] or lists[list_id]["name"] or list_id): resp for list_id, resp in list_resp.items()}
         )
-    
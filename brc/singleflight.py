@@ -0,0 +1,43 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+class SingleFlight():
+    """
+Coalesces concurrent identical reads
+
+While a read for a key is in flight, other callers asking for the same key wait for its result instead of
+running their own query. If ``ttl`` is set, results are also kept for that many seconds (a micro cache),
+so results must not be mutated by callers
+    """
+    def __init__(self, ttl: float = 0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._cache: dict[Hashable, tuple[float, Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ttl:
+            cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._done(key, f))
+
+        # Shielded so one caller going away does not cancel the read for everyone else
+        return await asyncio.shield(fut)
+
+    def _done(self, key: Hashable, fut: asyncio.Future):
+        self._inflight.pop(key, None)
+        if fut.cancelled() or fut.exception() or not self.ttl:
+            return
+        if len(self._cache) >= self.max_entries:
+            now = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if now - v[0] < self.ttl}
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+        self._cache[key] = (time.monotonic(), fut.result())
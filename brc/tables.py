@@ -2,7 +2,7 @@ import secrets
 import enum
 
 from piccolo.table import Table
-from piccolo.columns import Text, Timestamptz, Integer, ForeignKey, UUID, BigInt, Array, Boolean
+from piccolo.columns import Text, Timestamptz, Integer, ForeignKey, UUID, BigInt, Array, Boolean, JSONB
 from piccolo.columns.defaults.timestamptz import TimestamptzNow
 from piccolo.columns.base import OnDelete, OnUpdate
 
@@ -34,6 +34,14 @@ A lists state
     BLACKLISTED = 3
     UNCONFIRMED_ENROLLMENT = 4
 
+class DeliveryState(enum.IntEnum):
+    """
+State of a list webhook delivery
+    """
+    PENDING = 0
+    DELIVERED = 1
+    FAILED = 2
+
 class BotList(Table, tablename="bot_list"):
     id = UUID(primary_key=True)
     state = Integer(null=False, choices=ListState, default=ListState.PENDING_API_SUPPORT)
@@ -46,6 +54,7 @@ class BotList(Table, tablename="bot_list"):
     deny_bot_api = Text(null=False)
     domain = Text(null=False)
     secret_key = Text(null=False, default=secrets.token_urlsafe)
+    updated_at = Timestamptz(null=False, default=TimestamptzNow()) # Set by a trigger on every update
 
 class BotAction(Table, tablename="bot_action"):
     id = UUID(primary_key=True)
@@ -79,7 +88,30 @@ class BotQueue(Table, tablename="bot_queue"):
     reviewer = BigInt(null=True)
     invite_link = Text(null=True)
     cross_add = Boolean(null=False, default=True)
+    updated_at = Timestamptz(null=False, default=TimestamptzNow()) # Set by a trigger on every update
+    # Also has a generated ``search`` tsvector column (not mapped as piccolo has no tsvector type), used by GET /bots/search
 
 class Users(Table, tablename="users"):
     user_id = BigInt(primary_key=True)
     nonce = Text(null=False)
+
+class DeliveryOutbox(Table, tablename="delivery_outbox"):
+    id = UUID(primary_key=True)
+    bot_id = BigInt(null=False)
+    action = Integer(null=False, choices=Action)
+    list_id = ForeignKey(null=False, references=BotList, on_delete=OnDelete.cascade, on_update=OnUpdate.cascade)
+    payload = JSONB(null=False)
+    state = Integer(null=False, choices=DeliveryState, default=DeliveryState.PENDING)
+    attempts = Integer(null=False, default=0)
+    next_attempt = Timestamptz(null=False, default=TimestamptzNow())
+    last_status = Integer(null=True)
+    last_error = Text(null=True)
+    created_at = Timestamptz(null=False, default=TimestamptzNow())
+
+class QueueCounter(Table, tablename="queue_counter"):
+    """Maintained by a trigger on ``bot_queue``, see the migration adding this table"""
+    id = Text(primary_key=True) # kind:name:state
+    kind = Text(null=False) # state, list, tag, reviewer, claim_time or decision_time
+    name = Text(null=False)
+    state = Integer(null=True, choices=State)
+    count = BigInt(null=False, default=0)
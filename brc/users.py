@@ -0,0 +1,52 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+import discord
+from .singleflight import SingleFlight
+
+class UserCache():
+    """
+Bounded LRU cache of discord users resolved over REST
+
+Users already in the gateway cache are returned directly. Misses are fetched through the bot's own client
+so they share its rate limit buckets with every other REST call, and concurrent lookups of the same id share one request.
+Ids that do not exist are cached too (for ``negative_ttl`` seconds) so repeated submissions of a bad id never reach discord
+    """
+    def __init__(self, client: discord.Client, ttl: float = 3600, negative_ttl: float = 300, max_entries: int = 10000):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache: OrderedDict[int, tuple[float, Optional[discord.User]]] = OrderedDict()
+        self._fetches = SingleFlight()
+
+    async def get(self, id: int) -> Optional[discord.User]:
+        """
+Returns the user with the given id or None if it does not exist
+
+Errors other than the user not existing (such as discord being down) are raised and not cached
+        """
+        user = self.client.get_user(id)
+        if user:
+            return user
+
+        cached = self._cache.get(id)
+        if cached:
+            if cached[0] > time.monotonic():
+                self._cache.move_to_end(id)
+                return cached[1]
+            del self._cache[id]
+
+        return await self._fetches.do(id, lambda: self._fetch(id))
+
+    async def _fetch(self, id: int) -> Optional[discord.User]:
+        try:
+            user = await self.client.fetch_user(id)
+        except discord.NotFound:
+            user = None
+
+        self._cache[id] = (time.monotonic() + (self.ttl if user else self.negative_ttl), user)
+        self._cache.move_to_end(id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return user